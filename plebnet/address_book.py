@@ -1,9 +1,16 @@
+import asyncio
+import heapq
+import json
+import os
 import random
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
+from enum import IntEnum
 
 import rsa
+from pyasn1.error import PyAsn1Error
 
 from plebnet.messaging import Contact
 from plebnet.messaging import Message
@@ -12,15 +19,28 @@ from plebnet.messaging import MessageDeliveryError
 from plebnet.messaging import MessageReceiver
 from plebnet.messaging import MessageSender
 from plebnet.messaging import now
+from plebnet.messaging import run_coroutine
 from plebnet.messaging import generate_contact_key_pair
 
 
+class Command(IntEnum):
+    """
+    Commands of the address book messages. Messages carry the plain integer value, which is cheaper to pickle
+    and to compare than a command name.
+    """
+    ADD_CONTACT = 1
+    PING = 2
+
+
 class AddressBook(MessageConsumer):
     """
     Node address book, responsible for sharing new contacts and deleting inactive ones.
     """
     _messaging_channel = 'network'
 
+    # Maximum number of threads sending outbound messages in the background
+    _send_pool_size = 8
+
     def __init__(
             self,
             self_contact: Contact,
@@ -28,26 +48,78 @@ class AddressBook(MessageConsumer):
             contacts=None,
             receiver_notify_interval=1.0,
             contact_restore_timeout=3600,
-            inactive_nodes_ping_interval=1799
+            inactive_nodes_ping_interval=1799,
+            gossip_fanout=16,
+            snapshot_path=None,
+            snapshot_interval=60
     ):
         """
         Initializes a new address book.
         :param self_contact: contact of the owner of the address book
         :param private_key: private key of the message receiver
-        :param contacts: list of known contacts
+        :param contacts: list of known contacts, or dict of known contacts indexed by id
         :param receiver_notify_interval: interval at which the message receiver notifies of new messages
         :param contact_restore_timeout: timeout of pinging of inactive nodes before deletion
         :param inactive_nodes_ping_interval: interval for pinging inactive nodes
+        :param gossip_fanout: maximum number of contacts a new contact is forwarded to
+        :param snapshot_path: path of the file the contacts are periodically saved to, and loaded from when no contacts
+        are given
+        :param snapshot_interval: interval for saving the contacts to the snapshot file
         """
 
+        # Snapshot paths may be given as path-like objects, e.g. pathlib.Path
+        if snapshot_path is not None:
+            snapshot_path = os.fspath(snapshot_path)
+
+        # Contacts restored from a previous run, pinged at startup to find out which ones are still alive
+        restored_contacts = []
+
+        if contacts is None and snapshot_path is not None and os.path.isfile(snapshot_path):
+            restored_contacts = self._load_snapshot(snapshot_path)
+            contacts = restored_contacts
+
         if contacts is None:
             contacts = []
 
-        self.contacts = deepcopy(contacts)
+        if isinstance(contacts, dict):
+            contacts = contacts.values()
+
+        # Contacts are indexed by id, so lookups don't require scanning the whole address book
+        self.contacts = {contact.id: contact for contact in deepcopy(list(contacts))}
         self._private_key = private_key
 
+        self.self_contact = self_contact
+        self._contact_restore_timeout = contact_restore_timeout
+        self._inactive_nodes_ping_interval = inactive_nodes_ping_interval
+        self._gossip_fanout = gossip_fanout
+        self._snapshot_path = snapshot_path
+        self._snapshot_interval = snapshot_interval
+
+        self._start(receiver_notify_interval)
+
+        if restored_contacts:
+            self._submit_send(self._ping_contacts, [self.contacts[contact.id] for contact in restored_contacts])
+
+    def _start(self, receiver_notify_interval, consumers=None) -> None:
+        """
+        Builds the runtime state of the address book and starts its receiver and background threads.
+        :param receiver_notify_interval: interval at which the message receiver notifies of new messages
+        :param consumers: consumers to register to the receiver besides the address book, by channel
+        """
+
+        # Known contacts are also split in an active and an inactive tier, so forwarding only walks the active
+        # contacts and pinging only looks up the inactive ones
+        self._active_contacts = {}
+        self._inactive_contacts = {}
+
+        for contact in self.contacts.values():
+            self._add_to_tier(contact)
+
+        # Guards mutations of the contacts, iterations work on snapshots taken while holding it
+        self._contacts_lock = threading.Lock()
+
         self.receiver = MessageReceiver(
-            port=self_contact.port,
+            port=self.self_contact.port,
             private_key=self._private_key,
             contacts=self.contacts,
             notify_interval=receiver_notify_interval
@@ -55,23 +127,208 @@ class AddressBook(MessageConsumer):
 
         self.receiver.register_consumer(channel=self._messaging_channel, message_consumer=self)
 
-        self.self_contact = self_contact
-        self._contact_restore_timeout = contact_restore_timeout
-        self._inactive_nodes_ping_interval = inactive_nodes_ping_interval
-        
+        if consumers is not None:
+
+            for channel, channel_consumers in consumers.items():
+
+                for consumer in channel_consumers:
+                    self.receiver.register_consumer(channel=channel, message_consumer=consumer)
+
+        # Set when the address book is killed, so that its background threads terminate promptly
+        self._stop = threading.Event()
+
+        # Serializes saves, which all go through the same temporary file
+        self._snapshot_lock = threading.Lock()
+
+        self._send_pool = ThreadPoolExecutor(max_workers=self._send_pool_size, thread_name_prefix='ab-send')
+
+        # Pings of inactive contacts are scheduled in a heap of (deadline, contact id) entries
+        self._ping_heap = []
+        self._scheduled_pings = set()
+        self._ping_condition = threading.Condition()
+
+        for contact in self.contacts.values():
+
+            if not contact.is_active():
+                self._schedule_ping(contact)
+
         thread = threading.Thread(target=self._start_pinging_inactive_nodes)
         thread.daemon = True
         thread.start()
 
+        if self._snapshot_path is not None:
+            thread = threading.Thread(target=self._start_saving_snapshots)
+            thread.daemon = True
+            thread.start()
+
+    def __getstate__(self) -> dict:
+        """
+        Gets the state to pickle, e.g. when the QTable is saved with jsonpickle. Locks, threads and the receiver
+        can not be restored, so only the configuration and the contacts are kept.
+        :return: the state of the address book
+        """
+
+        consumers = {}
+
+        for channel, channel_consumers in self.receiver._consumers.items():
+
+            others = [consumer for consumer in channel_consumers if consumer is not self]
+
+            if others:
+                consumers[channel] = others
+
+        return {
+            'self_contact': self.self_contact,
+            'private_key': self._private_key,
+            'contacts': self.get_contacts(),
+            'receiver_notify_interval': self.receiver.notify_interval,
+            'receiver_consumers': consumers,
+            'contact_restore_timeout': self._contact_restore_timeout,
+            'inactive_nodes_ping_interval': self._inactive_nodes_ping_interval,
+            'gossip_fanout': self._gossip_fanout,
+            'snapshot_path': self._snapshot_path,
+            'snapshot_interval': self._snapshot_interval
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        """
+        Restores a pickled address book, rebuilding its runtime state and restarting its receiver and threads.
+        :param state: state returned by __getstate__
+        """
+
+        self.contacts = {contact.id: contact for contact in state['contacts']}
+        self._private_key = state['private_key']
+
+        self.self_contact = state['self_contact']
+        self._contact_restore_timeout = state['contact_restore_timeout']
+        self._inactive_nodes_ping_interval = state['inactive_nodes_ping_interval']
+        self._gossip_fanout = state['gossip_fanout']
+        self._snapshot_path = state['snapshot_path']
+
+        if self._snapshot_path is not None:
+            self._snapshot_path = os.fspath(self._snapshot_path)
+
+        self._snapshot_interval = state['snapshot_interval']
+
+        self._start(state['receiver_notify_interval'], state['receiver_consumers'])
+
     def kill(self) -> None:
         """
-        Kills the AddressBook by killing its MessageReceiver.    
+        Kills the AddressBook by killing its MessageReceiver and stopping its background threads.
         """
+        self._stop.set()
+
         try:
             self.receiver.kill()
         except:
             pass
 
+        # Wake up the pinging thread, so it can terminate
+        with self._ping_condition:
+            self._ping_condition.notify_all()
+
+        self._send_pool.shutdown(wait=False)
+
+    def close(self) -> None:
+        """
+        Kills the AddressBook, waits for the outbound messages already submitted to be sent,
+        and saves the contacts to the snapshot file, if any.
+        """
+        self.kill()
+
+        self._send_pool.shutdown(wait=True)
+
+        if self._snapshot_path is not None:
+            self.save_snapshot()
+
+    def save_snapshot(self) -> None:
+        """
+        Saves the known contacts to the snapshot file. The file is replaced atomically, so an interrupted
+        save never leaves a truncated snapshot behind.
+        """
+
+        contacts = [
+            {
+                'id': contact.id,
+                'host': contact.host,
+                'port': contact.port,
+                'public_key': contact.public_key.save_pkcs1().decode('utf-8')
+            }
+            for contact in self.get_contacts()
+        ]
+
+        temporary_path = self._snapshot_path + '.tmp'
+
+        with self._snapshot_lock:
+
+            with open(temporary_path, 'w') as snapshot_file:
+                json.dump(contacts, snapshot_file)
+
+            os.replace(temporary_path, self._snapshot_path)
+
+    @staticmethod
+    def _load_snapshot(snapshot_path: str) -> list:
+        """
+        Loads contacts saved by save_snapshot. Malformed entries are skipped.
+        :param snapshot_path: path of the snapshot file
+        :return: list of the loaded contacts, empty if the snapshot can not be read
+        """
+
+        try:
+
+            with open(snapshot_path) as snapshot_file:
+                entries = json.load(snapshot_file)
+
+        except (OSError, ValueError):
+
+            return []
+
+        if not isinstance(entries, list):
+            return []
+
+        contacts = []
+
+        for contact in entries:
+
+            try:
+
+                contacts.append(Contact(
+                    id=contact['id'],
+                    host=contact['host'],
+                    port=contact['port'],
+                    public_key=rsa.PublicKey.load_pkcs1(contact['public_key'].encode('utf-8'))
+                ))
+
+            except (ValueError, KeyError, TypeError, AttributeError, PyAsn1Error):
+
+                continue
+
+        return contacts
+
+    def _start_saving_snapshots(self) -> None:
+        """
+        Starts periodically saving the contacts to the snapshot file.
+        """
+
+        while not self._stop.wait(self._snapshot_interval):
+
+            try:
+                self.save_snapshot()
+            except OSError:
+                continue
+
+    def _submit_send(self, fn, *args) -> None:
+        """
+        Runs a sending function in the background send pool, so the calling thread does not block on the network.
+        Sends submitted after the address book is killed are dropped.
+        :param fn: function to run
+        :param args: arguments of the function
+        """
+        try:
+            self._send_pool.submit(fn, *args)
+        except RuntimeError:
+            pass
+
     def _generate_add_contact_message(self, contact: Contact) -> Message:
         """
         Generates an "add-contact" message.
@@ -80,27 +337,37 @@ class AddressBook(MessageConsumer):
 
         return Message(
             channel=self._messaging_channel,
-            command='add-contact',
+            command=Command.ADD_CONTACT.value,
             data=contact
         )
 
     def _add_contact(self, contact: Contact) -> None:
         """
-        Handles incoming "add-contacts" commands.
+        Handles incoming "add-contacts" commands, ignoring known contacts.
         :param contact: contact to add
         """
 
+        # Most received contacts are already known: reject them with a single dict lookup, without taking any lock.
+        # Contacts passing this check are checked again under the contacts lock when appended.
+        if contact.id in self.contacts:
+            return
+
         self.create_new_distributed_contact(contact)
 
     def _forward_contact(self, contact: Contact) -> None:
         """
-        Forwards a contact to all other known contacts.
+        Forwards a contact to a random sample of at most gossip_fanout other known contacts.
+        Since every node forwards a contact only the first time it learns about it, the contact
+        still spreads through the whole network in a logarithmic number of hops.
         :param contact: contact to forward
         """
 
         message = self._generate_add_contact_message(contact)
 
-        for known_contact in self.contacts:
+        recipients = []
+
+        # Inactive contacts would reject the message anyway, they are pinged until they come back or are deleted
+        for known_contact in self._contacts_snapshot(self._active_contacts):
 
             # Prevent notifying a contact of themselves
             if known_contact.id == contact.id:
@@ -110,7 +377,12 @@ class AddressBook(MessageConsumer):
             if known_contact.id == self.self_contact.id:
                 continue
 
-            self.send_message_to_contact(known_contact, message)
+            recipients.append(known_contact)
+
+        if len(recipients) > self._gossip_fanout:
+            recipients = random.sample(recipients, self._gossip_fanout)
+
+        self._submit_send(self.send_message_to_contacts, recipients, message)
 
     def send_message_to_contact(self, recipient: Contact, message: Message) -> bool:
         """
@@ -120,10 +392,51 @@ class AddressBook(MessageConsumer):
         :return: True iff the delivery of the message was successful
         """
 
+        encoded_message = MessageSender.encode_message(message, self._private_key)
+
+        return run_coroutine(self._send_message_to_contact_async(recipient, encoded_message))
+
+    def send_message_to_contacts(self, recipients: list, message: Message) -> list:
+        """
+        Sends a message to several contacts concurrently, marking the links to the recipients as either up or down.
+        :param recipients: contacts of the recipient nodes
+        :param message: message to send
+        :return: for each recipient, True iff the delivery of the message was successful
+        """
+
+        if not recipients:
+            return []
+
+        # The message is encoded and signed once, only the symmetric key is encrypted for each recipient
+        encoded_message = MessageSender.encode_message(message, self._private_key)
+
+        return run_coroutine(self._gather_sends(recipients, encoded_message))
+
+    async def _gather_sends(self, recipients: list, encoded_message: tuple) -> list:
+        """
+        Sends an encoded message to several contacts concurrently.
+        :param recipients: contacts of the recipient nodes
+        :param encoded_message: message encoded by MessageSender.encode_message
+        :return: for each recipient, True iff the delivery of the message was successful
+        """
+
+        return list(await asyncio.gather(
+            *[self._send_message_to_contact_async(recipient, encoded_message) for recipient in recipients]
+        ))
+
+    async def _send_message_to_contact_async(self, recipient: Contact, encoded_message: tuple) -> bool:
+        """
+        Sends an encoded message to a contact on the messaging event loop, and marks the link to the recipient as
+        either up or down.
+        :param recipient: recipient node's contact
+        :param encoded_message: message encoded by MessageSender.encode_message
+        :return: True iff the delivery of the message was successful
+        """
+
         try:
 
             sender = MessageSender(recipient)
-            sender.send_message(message, self.self_contact.id, self._private_key)
+            await sender.send_encoded_message_async(encoded_message, self.self_contact.id)
 
             self._set_link_state(True, recipient)
 
@@ -142,17 +455,27 @@ class AddressBook(MessageConsumer):
         :param contact: contact to set the link's state of
         """
 
-        for known_contact in self.contacts:
+        with self._contacts_lock:
 
-            if known_contact.id == contact.id:
+            known_contact = self.contacts.get(contact.id)
+
+            if known_contact is None:
+                return
+
+            if link_up:
+
+                known_contact.link_up()
 
-                if link_up:
+            else:
 
-                    known_contact.link_up()
+                known_contact.link_down()
 
-                else:
+            self._active_contacts.pop(contact.id, None)
+            self._inactive_contacts.pop(contact.id, None)
+            self._add_to_tier(known_contact)
 
-                    known_contact.link_down()
+        if not link_up:
+            self._schedule_ping(known_contact)
 
     def _delete_contact(self, contact: Contact) -> None:
         """
@@ -161,12 +484,21 @@ class AddressBook(MessageConsumer):
         :return:
         """
 
-        for known_contact in self.contacts:
+        with self._contacts_lock:
+            self.contacts.pop(contact.id, None)
+            self._active_contacts.pop(contact.id, None)
+            self._inactive_contacts.pop(contact.id, None)
 
-            if known_contact.id == contact.id:
-                self.contacts.remove(known_contact)
+    def _add_to_tier(self, contact: Contact) -> None:
+        """
+        Adds a contact to the active or inactive tier, depending on its link state.
+        :param contact: contact to add
+        """
 
-                return
+        if contact.is_active():
+            self._active_contacts[contact.id] = contact
+        else:
+            self._inactive_contacts[contact.id] = contact
 
     def _generate_ping_message(self) -> Message:
         """
@@ -176,43 +508,115 @@ class AddressBook(MessageConsumer):
 
         return Message(
             channel=self._messaging_channel,
-            command="ping"
+            command=Command.PING.value
         )
 
+    def _schedule_ping(self, contact: Contact) -> None:
+        """
+        Schedules a ping of an inactive contact after the inactive nodes ping interval, if not scheduled already.
+        :param contact: contact to ping
+        """
+
+        with self._ping_condition:
+
+            if contact.id in self._scheduled_pings:
+                return
+
+            self._scheduled_pings.add(contact.id)
+
+            deadline = time.monotonic() + self._inactive_nodes_ping_interval
+            heapq.heappush(self._ping_heap, (deadline, contact.id))
+
+            self._ping_condition.notify()
+
+    def _wait_for_due_pings(self) -> list:
+        """
+        Blocks until at least one scheduled ping is due, or the address book is killed.
+        :return: ids of the contacts to ping
+        """
+
+        with self._ping_condition:
+
+            while not self._stop.is_set():
+
+                if not self._ping_heap:
+                    self._ping_condition.wait()
+                    continue
+
+                timeout = self._ping_heap[0][0] - time.monotonic()
+
+                if timeout > 0:
+                    self._ping_condition.wait(timeout)
+                    continue
+
+                due_contact_ids = []
+
+                while self._ping_heap and self._ping_heap[0][0] <= time.monotonic():
+                    _, contact_id = heapq.heappop(self._ping_heap)
+                    self._scheduled_pings.discard(contact_id)
+                    due_contact_ids.append(contact_id)
+
+                return due_contact_ids
+
+            return []
+
     def _start_pinging_inactive_nodes(self) -> None:
         """
-        Starts periodically pinging inactive nodes.
+        Starts pinging inactive nodes when their scheduled pings are due. The pings are sent by the send pool,
+        and failed pings are rescheduled by the link state update, until the contact restore timeout expires.
         """
 
-        while not self.receiver.kill_flag:
+        while not self._stop.is_set():
 
-            time.sleep(self._inactive_nodes_ping_interval)
+            due_contact_ids = self._wait_for_due_pings()
 
-            if self.receiver.kill_flag:
+            if self._stop.is_set():
                 return
 
-            for contact in self.contacts:
+            contacts_to_ping = []
+
+            with self._contacts_lock:
+
+                for contact_id in due_contact_ids:
+
+                    contact = self._inactive_contacts.get(contact_id)
+
+                    if contact is not None:
+                        contacts_to_ping.append(contact)
+
+            if contacts_to_ping:
+                self._submit_send(self._ping_contacts, contacts_to_ping)
+
+    def _ping_contacts(self, contacts: list) -> None:
+        """
+        Pings inactive contacts, and deletes the ones which did not respond within the contact restore timeout.
+        :param contacts: contacts to ping
+        """
+
+        ping_message = self._generate_ping_message()
 
-                if not contact.is_active():
+        results = self.send_message_to_contacts(contacts, ping_message)
 
-                    ping_message = self._generate_ping_message()
+        current_timestamp = now()
 
-                    if not self.send_message_to_contact(contact, ping_message):
+        for contact, delivered in zip(contacts, results):
 
-                        current_timestamp = now()
+            # The contact may have come back up through another send in the meantime
+            if not delivered and not contact.is_active():
 
-                        if current_timestamp - contact.first_failure > self._contact_restore_timeout:
+                if current_timestamp - contact.first_failure > self._contact_restore_timeout:
 
-                            self._delete_contact(contact)
+                    self._delete_contact(contact)
 
     def notify(self, message: Message, sender_id) -> None:
         """
-        Handles incoming messages.
+        Handles incoming messages. Nodes running an older version send command names instead of opcodes, so both
+        are accepted. Pings need no handling, receiving them is enough.
         :param sender_id: id of the message sender
         :param message: message to handle
         """
 
-        if message.command == 'add-contact':
+        if message.command in (Command.ADD_CONTACT, 'add-contact'):
             self._add_contact(message.data)
 
     def create_new_distributed_contact(self, contact: Contact) -> None:
@@ -231,30 +635,40 @@ class AddressBook(MessageConsumer):
         :return: true iff the contact list has changed as a result of the operation
         """
 
-        if contact.id == self.self_contact.id:
-            return False
-
-        for known_contact in self.contacts:
+        with self._contacts_lock:
 
-            if known_contact.id == contact.id:
+            if contact.id == self.self_contact.id or contact.id in self.contacts:
                 return False
 
-        self.contacts.append(contact)
+            self.contacts[contact.id] = contact
+            self._add_to_tier(contact)
+
+        if not contact.is_active():
+            self._schedule_ping(contact)
 
         return True
 
     def send_message_to_all_contacts(self, message: Message) -> bool:
 
-        result = True
+        return all(self.send_message_to_contacts(self.get_contacts(), message))
 
-        for contact in self.contacts:
+    def get_contacts(self) -> list:
+        """
+        Gets a snapshot of the known contacts, which can be iterated while contacts are being added or deleted.
+        :return: list of the known contacts
+        """
 
-            result = result and self.send_message_to_contact(
-                contact,
-                message
-            )
+        return self._contacts_snapshot(self.contacts)
+
+    def _contacts_snapshot(self, contacts: dict) -> list:
+        """
+        Takes a snapshot of known contacts, which can be iterated while the contacts are being modified.
+        :param contacts: contacts dictionary to take a snapshot of, either all contacts or one of the tiers
+        :return: list of the contacts
+        """
 
-        return result
+        with self._contacts_lock:
+            return list(contacts.values())
 
 
 def _demo():  # pragma: no cover
@@ -283,62 +697,71 @@ def _demo():  # pragma: no cover
 
     nodes = [root]
 
-    while True:
+    try:
 
-        port_counter += 1
-        id_counter += 1
+        while True:
 
-        replicating_node = random.choice(nodes)
+            port_counter += 1
+            id_counter += 1
 
-        print("Node " + replicating_node.self_contact.id + " replicates: \n")
+            replicating_node = random.choice(nodes)
 
-        new_node_contact_list = replicating_node.contacts.copy()
-        new_node_contact_list.append(replicating_node.self_contact)
+            print("Node " + replicating_node.self_contact.id + " replicates: \n")
 
-        pub, priv = generate_contact_key_pair()
+            new_node_contact_list = replicating_node.get_contacts()
+            new_node_contact_list.append(replicating_node.self_contact)
 
-        new_node_contact = Contact(
-            id=str(id_counter),
-            host='127.0.0.1',
-            port=port_counter,
-            public_key=pub
-        )
+            pub, priv = generate_contact_key_pair()
 
-        new_node = AddressBook(
-            self_contact=new_node_contact,
-            private_key=priv,
-            contacts=new_node_contact_list,
-            contact_restore_timeout=restore_timeout,
-            inactive_nodes_ping_interval=ping_interval,
-            receiver_notify_interval=receiver_notify_interval
-        )
+            new_node_contact = Contact(
+                id=str(id_counter),
+                host='127.0.0.1',
+                port=port_counter,
+                public_key=pub
+            )
 
-        nodes.append(new_node)
+            new_node = AddressBook(
+                self_contact=new_node_contact,
+                private_key=priv,
+                contacts=new_node_contact_list,
+                contact_restore_timeout=restore_timeout,
+                inactive_nodes_ping_interval=ping_interval,
+                receiver_notify_interval=receiver_notify_interval
+            )
 
-        replicating_node.create_new_distributed_contact(new_node_contact)
+            nodes.append(new_node)
 
-        time.sleep(1)
+            replicating_node.create_new_distributed_contact(new_node_contact)
 
-        for node in nodes:
+            time.sleep(1)
 
-            contacts = ""
+            for node in nodes:
 
-            for contact in node.contacts:
-                contacts += contact.id + ", "
+                contacts = ""
 
-            print("Node " + node.self_contact.id + " has " + str(len(node.contacts)) + " contacts: " + contacts)
+                node_contacts = node.get_contacts()
 
-        time.sleep(1)
+                for contact in node_contacts:
+                    contacts += contact.id + ", "
 
-        for i in range(int(len(nodes) / 3)):
-            node_to_remove = random.choice(nodes)
-            print("Killing node " + node_to_remove.self_contact.id)
-            node_to_remove.receiver.kill()
-            nodes.remove(node_to_remove)
+                print("Node " + node.self_contact.id + " has " + str(len(node_contacts)) + " contacts: " + contacts)
 
-        time.sleep(3)
+            time.sleep(1)
 
-        print("")
+            for i in range(int(len(nodes) / 3)):
+                node_to_remove = random.choice(nodes)
+                print("Killing node " + node_to_remove.self_contact.id)
+                node_to_remove.kill()
+                nodes.remove(node_to_remove)
+
+            time.sleep(3)
+
+            print("")
+
+    except KeyboardInterrupt:
+
+        for node in nodes:
+            node.close()
 
 
 if __name__ == '__main__':  # pragma: no cover
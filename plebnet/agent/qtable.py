@@ -240,8 +240,8 @@ class QTable:
         child_contact = messaging.Contact(child_id, ip, self.port, child_pub)
         new_address_book = address_book.AddressBook(self_contact=child_contact,
                                                     private_key=child_priv,
-                                                    contacts=self.address_book.contacts)
-        new_address_book.contacts.append(self.address_book.self_contact)
+                                                    contacts=self.address_book.get_contacts()
+                                                    + [self.address_book.self_contact])
         # TODO : Add child's contact to parent's addressbook?
         return new_address_book
 
@@ -395,8 +395,7 @@ class QTable:
         Method that share local QTable with n nodes when the agent tries to reproduce.
         """
         msg = messaging.Message('qtable', 'qtable', self.qtable)
-        for contact in self.address_book.contacts:
-            self.address_book.send_message_to_contact(contact, msg)
+        self.address_book.send_message_to_all_contacts(msg)
 
 
 class ProviderOffer:
@@ -7,25 +7,88 @@ If Tribler alters its call methods, this should be the only file which needs to
 
 import os
 import subprocess
+import time
 
 import requests
 
-from requests.exceptions import ConnectionError
+from requests.exceptions import ConnectionError, Timeout
+
+try:
+    from pydbus import SystemBus
+except ImportError:
+    SystemBus = None
 
 from plebnet.utilities import logger
 from plebnet.settings import plebnet_settings
 
 setup = plebnet_settings.get_instance()
 
+STATISTICS_URL = 'http://localhost:8085/trustchain/statistics'
+STATISTICS_TIMEOUT = 2.0
+
+# Seconds during which a statistics response is reused, so polling all getters costs a single request
+STATISTICS_CACHE_TTL = 1.0
+
+_session = requests.Session()
+_statistics_cache = {'time': None, 'statistics': None}
+
+_tribler_unit = None
+# Set when the system bus can't be used, so later checks go straight to systemctl
+_dbus_unavailable = False
+_plebnet_dir = None
+
+
+def _get_tribler_unit():
+    """
+    Gets a D-Bus proxy of the tribler.service systemd unit, loading it on first use.
+    :return: the unit proxy
+    """
+    global _tribler_unit
+
+    if _tribler_unit is None:
+        bus = SystemBus()
+        unit_path = bus.get('.systemd1').LoadUnit('tribler.service')
+        _tribler_unit = bus.get('.systemd1', unit_path)
+    return _tribler_unit
+
+
+def _get_plebnet_dir():
+    """
+    Gets the plebnet directory inside the PlebNet home, joining the path on first use.
+    :return: the path of the plebnet directory
+    """
+    global _plebnet_dir
+
+    if _plebnet_dir is None:
+        _plebnet_dir = os.path.join(setup.plebnet_home(), 'plebnet')
+    return _plebnet_dir
+
+
+def _systemctl_is_active():
+    """
+    Checks if tribler.service is active by running systemctl.
+    :return: True if tribler.service is active.
+    """
+    output = subprocess.run(['systemctl', 'is-active', 'tribler.service'], stdout=subprocess.PIPE).stdout.decode('utf-8')
+    return output == 'active\n'
+
 
 def running():
     """
-    Checks if Tribler is running.
+    Checks if Tribler is running, querying systemd over D-Bus when pydbus is available.
     :return: True if tribler.service is active.
     """
 
-    output = subprocess.run(['systemctl', 'is-active', 'tribler.service'], stdout=subprocess.PIPE).stdout.decode('utf-8')
-    process_running = (output == 'active\n')
+    global _dbus_unavailable
+
+    if SystemBus is None or _dbus_unavailable:
+        process_running = _systemctl_is_active()
+    else:
+        try:
+            process_running = (_get_tribler_unit().ActiveState == 'active')
+        except Exception:
+            _dbus_unavailable = True
+            process_running = _systemctl_is_active()
 
     print("process_running was: " + str(process_running))
 
@@ -58,9 +121,9 @@ def start():
         command.append('tribler@0.service')
 
     try:
-        exitcode = subprocess.call(command, cwd=os.path.join(setup.plebnet_home(), 'plebnet'), env=env)
+        exitcode = subprocess.call(command, cwd=_get_plebnet_dir(), env=env)
 
-        print("Exitcode was: " + str(exitcode))
+        logger.log('Exitcode was: ' + str(exitcode), "tribler_controller")
 
         if exitcode != 0:
             logger.error('Failed to start Tribler', "tribler_controller")
@@ -73,33 +136,50 @@ def start():
         return False
 
 
+def _get_statistics():
+    """
+    Gets the trustchain statistics from Tribler, reusing the last response while it is fresh.
+    :return: the statistics dictionary
+    :raises ConnectionError: if Tribler can not be reached
+    :raises Timeout: if Tribler does not respond within STATISTICS_TIMEOUT seconds
+    """
+    cached_at = _statistics_cache['time']
+    if cached_at is not None and time.monotonic() - cached_at < STATISTICS_CACHE_TTL:
+        return _statistics_cache['statistics']
+
+    statistics = _session.get(STATISTICS_URL, timeout=STATISTICS_TIMEOUT).json()['statistics']
+    _statistics_cache['time'] = time.monotonic()
+    _statistics_cache['statistics'] = statistics
+    return statistics
+
+
 def get_uploaded():
     try:
-        tu = requests.get('http://localhost:8085/trustchain/statistics').json()['statistics']['total_up']
+        tu = _get_statistics()['total_up']
         tu = int(tu)/1024.0/1024.0
         return tu
-    except ConnectionError:
+    except (ConnectionError, Timeout):
         return "Unable to retrieve amount of uploaded data"
 
 
 def get_helped_by():
     try:
-        return requests.get('http://localhost:8085/trustchain/statistics').json()['statistics']['peers_that_helped_pk']
-    except ConnectionError:
+        return _get_statistics()['peers_that_helped_pk']
+    except (ConnectionError, Timeout):
         return "Unable to retrieve amount of peers that helped this agent"
 
 
 def get_helped():
     try:
-        return requests.get('http://localhost:8085/trustchain/statistics').json()['statistics']['peers_that_pk_helped']
-    except ConnectionError:
+        return _get_statistics()['peers_that_pk_helped']
+    except (ConnectionError, Timeout):
         return "Unable to retrieve amount of peers helped by this agent"
 
 
 def get_downloaded():
     try:
-        td = requests.get('http://localhost:8085/trustchain/statistics').json()['statistics']['total_down']
+        td = _get_statistics()['total_down']
         td = int(td)/1024.0/1024.0
         return td
-    except ConnectionError:
+    except (ConnectionError, Timeout):
         return "Unable to retrieve amount of downloaded data"
@@ -35,7 +35,7 @@ def generate_new_node_ab(
         public_key=new_pub
     )
 
-    new_node_contacts_list = copy.deepcopy(replicating_node.address_book.contacts)
+    new_node_contacts_list = copy.deepcopy(replicating_node.address_book.get_contacts())
     new_node_contacts_list.append(replicating_node.address_book.self_contact)
 
     return AddressBook(
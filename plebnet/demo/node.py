@@ -26,7 +26,9 @@ class Node:
 
         contacts_list = ""
 
-        for contact in self.address_book.contacts:
+        contacts = self.address_book.get_contacts()
+
+        for contact in contacts:
 
             contacts_list += contact.id + ", "
 
@@ -34,7 +36,7 @@ class Node:
         print("\tage: " + str(self.age))
         print("\tbtc balance: " + str(self.btc_balance))
         # print("\tmb balance: " + str(self.mb_tokens))
-        print("\tcontacts (" + str(len(self.address_book.contacts)) + "): " + contacts_list)
+        print("\tcontacts (" + str(len(contacts)) + "): " + contacts_list)
 
     def earn_bitcoins(self, print_format, output):
 
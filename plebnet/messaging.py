@@ -1,26 +1,28 @@
+import asyncio
 import collections
 import hashlib
 import pickle
-import random
+import secrets
 import socket
-import string
 import threading
 import time
-from datetime import datetime
-from typing import Tuple
+from typing import Tuple, Union
 
 import rsa
 from cryptography.fernet import Fernet
 
 _ack = b'\xff'
 
+_event_loop = None
+_event_loop_lock = threading.Lock()
+
 
 def now() -> int:
     """
     Gets the current timestamp in seconds.
     :return: current timestamp as integer
     """
-    return int(datetime.timestamp(datetime.now()))
+    return int(time.time())
 
     
 def generate_contact_id(parent_id: str = "") -> str:
@@ -30,19 +32,46 @@ def generate_contact_id(parent_id: str = "") -> str:
     :return: the generated id
     """
 
-    def generate_random_string(length):
-        letters = string.ascii_lowercase
-        return ''.join(random.choice(letters) for i in range(length))
-
     timestamp = str(now())
 
-    random_seed = generate_random_string(5) + parent_id
+    random_seed = secrets.token_bytes(4) + parent_id.encode('utf-8')
 
-    random_hash = hashlib.sha256(random_seed.encode('utf-8')).hexdigest()
+    # The hash is only an opaque identifier, a 16 bytes BLAKE2 digest is enough and cheaper than SHA-256
+    random_hash = hashlib.blake2b(random_seed, digest_size=16).hexdigest()
 
     return random_hash + timestamp
 
 
+def _get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Gets the event loop used to send messages concurrently, starting it in a daemon thread on first use.
+    :return: the running event loop
+    """
+    global _event_loop
+
+    with _event_loop_lock:
+
+        if _event_loop is None:
+
+            _event_loop = asyncio.new_event_loop()
+
+            thread = threading.Thread(target=_event_loop.run_forever)
+            thread.daemon = True
+            thread.start()
+
+    return _event_loop
+
+
+def run_coroutine(coroutine):
+    """
+    Runs a coroutine on the messaging event loop and waits for its result.
+    Must not be called from within the messaging event loop itself.
+    :param coroutine: coroutine to run
+    :return: the result of the coroutine
+    """
+    return asyncio.run_coroutine_threadsafe(coroutine, _get_event_loop()).result()
+
+
 def generate_contact_key_pair() -> Tuple[rsa.PublicKey, rsa.PrivateKey]:
     """
     Generates a key pair.
@@ -56,6 +85,9 @@ class Contact:
     Nodes contact.
     """
 
+    # Contacts are kept for every node of the network, so they are stored without a per-instance __dict__
+    __slots__ = ('id', 'host', 'port', 'public_key', 'first_failure')
+
     def __init__(self, id: str, host: str, port: int, public_key: rsa.PublicKey, first_failure=None):
         """
         Instantiates a contact
@@ -72,6 +104,20 @@ class Contact:
         self.public_key = public_key
         self.first_failure = first_failure
 
+    def __setstate__(self, state) -> None:
+        """
+        Restores a pickled contact. Contacts pickled before __slots__ was introduced have a dict state, later ones a
+        (dict state, slots state) tuple.
+        :param state: pickled state of the contact
+        """
+
+        if isinstance(state, tuple):
+            dict_state, slots_state = state
+            state = dict(dict_state or {}, **(slots_state or {}))
+
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def link_down(self) -> None:
         """
         Sets the node link as down, by storing the current time as first_failure, if not set already.
@@ -99,7 +145,7 @@ class Contact:
 
 class Message:
 
-    def __init__(self, channel: str, command: str, data=None):
+    def __init__(self, channel: str, command: Union[str, int], data=None):
         self.channel = channel
         self.command = command
         self.data = data
@@ -144,6 +190,22 @@ class MessageSender:
 
         self._ack_length = len(_ack)
 
+    @staticmethod
+    def encode_message(message: Message, private_key: rsa.PrivateKey) -> Tuple[bytes, bytes, bytes]:
+        """
+        Encodes, symmetrically encrypts and signs a message. The result does not depend on the receiver,
+        so a message sent to several receivers only needs to be encoded once.
+        :param message: message to encode
+        :param private_key: private key of the sender to sign the message
+        :return: a tuple containing the symmetric key used, the encoded encrypted payload and its signature
+        """
+
+        symmetric_key, payload = MessageSender._build_encrypted_payload(message)
+
+        signature = rsa.sign(payload, private_key, 'SHA-1')
+
+        return symmetric_key, payload, signature
+
     def _build_packet(self, message: Message, sender_id, private_key) -> Tuple[bytearray, bytearray]:
         """
         Builds packet header and payload to send.
@@ -153,13 +215,24 @@ class MessageSender:
         :return: a tuple containing the packet header and the packet payload
         """
 
-        symmetric_key, payload = self._build_encrypted_payload(message)
+        return self._build_encoded_packet(self.encode_message(message, private_key), sender_id)
+
+    def _build_encoded_packet(self, encoded_message: Tuple[bytes, bytes, bytes], sender_id) -> Tuple[bytearray, bytearray]:
+        """
+        Builds packet header and payload to send from an encoded message.
+        :param encoded_message: message encoded by encode_message
+        :param sender_id: id of the sender
+        :return: a tuple containing the packet header and the packet payload
+        """
 
-        header = self._build_header(payload, symmetric_key, sender_id, private_key)
+        symmetric_key, payload, signature = encoded_message
+
+        header = self._build_header(payload, symmetric_key, signature, sender_id)
 
         return header, payload
 
-    def _build_encrypted_payload(self, message: Message) -> Tuple[bytes, bytearray]:
+    @staticmethod
+    def _build_encrypted_payload(message: Message) -> Tuple[bytes, bytearray]:
         """
         Encodes and encrypts symmetrically encrypts payload with a generated key.
         :param message: message to build the payload from
@@ -173,18 +246,17 @@ class MessageSender:
 
         return symmetric_key, payload
 
-    def _build_header(self, payload, symmetric_key, sender_id, private_key) -> bytearray:
+    def _build_header(self, payload, symmetric_key, signature, sender_id) -> bytearray:
         """
         Builds a packet header
         :param payload: payload of the packet
         :param symmetric_key: symmetric key used to encrypt the payload
+        :param signature: signature of the payload by the sender of the message
         :param sender_id: id of the sender of the message
-        :param private_key: private key of the sender to sign the message
         :return: the built packet header
         """
 
         encrypted_symmetric_key = rsa.encrypt(symmetric_key, self.receiver.public_key)
-        signature = rsa.sign(payload, private_key, 'SHA-1')
 
         variable = (str(len(payload)) + ':' + sender_id).encode('utf-8')
 
@@ -229,6 +301,61 @@ class MessageSender:
 
             raise MessageDeliveryError()
 
+    async def send_encoded_message_async(
+            self,
+            encoded_message: Tuple[bytes, bytes, bytes],
+            sender_contact_id: str,
+            ack_timeout: float = 1.0,
+            connect_timeout: float = 1.0,
+            send_timeout: float = 10.0
+    ) -> None:
+        """
+        Sends a message previously encoded by encode_message, without blocking the event loop,
+        so that many messages can be in flight at once.
+        :param encoded_message: encoded message to send
+        :param sender_contact_id: contact id of the sender
+        :param ack_timeout: timeout of ack of header
+        :param connect_timeout: timeout of the connection to the receiver
+        :param send_timeout: timeout of each write to the receiver, and of the closing of the connection
+        """
+
+        try:
+
+            header, payload = self._build_encoded_packet(encoded_message, sender_contact_id)
+
+            # Connecting to receiver
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.receiver.host, self.receiver.port),
+                connect_timeout
+            )
+
+            try:
+
+                # Sending header
+                writer.write(header)
+                await asyncio.wait_for(writer.drain(), send_timeout)
+                await asyncio.wait_for(reader.read(self._ack_length), ack_timeout)
+
+                # Sending payload
+                writer.write(payload)
+                await asyncio.wait_for(writer.drain(), send_timeout)
+
+                # Closing connection, wait_closed is only available from Python 3.7
+                writer.close()
+
+                if hasattr(writer, 'wait_closed'):
+                    await asyncio.wait_for(writer.wait_closed(), send_timeout)
+
+            except BaseException:
+
+                # Dropping the connection without flushing it, a receiver which stopped reading would keep it open
+                writer.transport.abort()
+                raise
+
+        except Exception:
+
+            raise MessageDeliveryError()
+
 
 class MessageReceiver:
     """
@@ -246,7 +373,7 @@ class MessageReceiver:
             self,
             port: int,
             private_key: rsa.PrivateKey,
-            contacts: list,
+            contacts,
             connections_queue_size: int = 20,
             notify_interval: float = 1
     ):
@@ -340,11 +467,20 @@ class MessageReceiver:
         :param contact_id: id of the contact to retrieve the public key of
         :return: the retrieved public key
         """
-        for contact in self.contacts:
+        if isinstance(self.contacts, dict):
+
+            contact = self.contacts.get(contact_id)
 
-            if contact.id == contact_id:
+            if contact is not None:
                 return contact.public_key
 
+        else:
+
+            for contact in self.contacts:
+
+                if contact.id == contact_id:
+                    return contact.public_key
+
         raise Exception("Contact not found " + contact_id)
 
     def kill(self) -> None:
@@ -5,9 +5,12 @@ in a color.
 """
 
 # Total imports
+import atexit
 import logging
+import queue
+import sys
 
-from logging.handlers import WatchedFileHandler
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
 # Local imports
 from plebnet.settings import plebnet_settings
 
@@ -43,6 +46,29 @@ def _get_logger(name=settings.logger_filename()):
     return logger
 
 
+def _get_console():
+    """
+    Gets the logger printing the verbose output. Its messages are queued and written
+    to stdout by a background thread, so callers never block on the terminal.
+    """
+    console = logging.getLogger('plebnet.console')
+
+    if not console.handlers:
+
+        console.setLevel(logging.INFO)
+        console.propagate = False
+
+        log_queue = queue.Queue(-1)
+        console.addHandler(QueueHandler(log_queue))
+
+        listener = QueueListener(log_queue, logging.StreamHandler(sys.stdout))
+        listener.start()
+        # flush the remaining messages on exit
+        atexit.register(listener.stop)
+
+    return console
+
+
 def put_msg(msg, color=None, origin="", method=_get_logger().info):
     msg = _fill(origin, 15) + " : " + msg
     if settings.active_logger():
@@ -50,7 +76,7 @@ def put_msg(msg, color=None, origin="", method=_get_logger().info):
     if settings.active_verbose():
         if color:
             msg = color + msg + bcolors.ENDC
-        print(msg)
+        _get_console().info(msg)
 
 
 def log(msg, origin=""): put_msg(str(msg), origin=str(origin))
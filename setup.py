@@ -55,6 +55,7 @@ setup(
 
     extras_require={
         'dev': [],
+        'dbus': ['pydbus'],
         'test': ['mock', 'pytest', 'responses'],
     },
 
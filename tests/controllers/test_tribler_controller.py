@@ -10,6 +10,53 @@ import plebnet.settings.plebnet_settings as Settings
 
 class TestTriblerController(unittest.TestCase):
 
+    def setUp(self):
+        Tribler._statistics_cache['time'] = None
+
+    def test_running_systemctl(self):
+        self.true_system_bus = Tribler.SystemBus
+        self.true_subprocess_run = subprocess.run
+
+        Tribler.SystemBus = None
+        subprocess.run = MagicMock(return_value=MagicMock(stdout=b'active\n'))
+        assert(Tribler.running())
+        subprocess.run = MagicMock(return_value=MagicMock(stdout=b'inactive\n'))
+        self.assertFalse(Tribler.running())
+
+        subprocess.run = self.true_subprocess_run
+        Tribler.SystemBus = self.true_system_bus
+
+    def test_running_dbus(self):
+        self.true_system_bus = Tribler.SystemBus
+        self.true_get_tribler_unit = Tribler._get_tribler_unit
+
+        Tribler.SystemBus = MagicMock()
+        Tribler._get_tribler_unit = MagicMock(return_value=MagicMock(ActiveState='active'))
+        assert(Tribler.running())
+        Tribler._get_tribler_unit = MagicMock(return_value=MagicMock(ActiveState='inactive'))
+        self.assertFalse(Tribler.running())
+
+        Tribler._get_tribler_unit = self.true_get_tribler_unit
+        Tribler.SystemBus = self.true_system_bus
+
+    def test_running_dbus_unavailable(self):
+        self.true_system_bus = Tribler.SystemBus
+        self.true_get_tribler_unit = Tribler._get_tribler_unit
+        self.true_subprocess_run = subprocess.run
+
+        Tribler.SystemBus = MagicMock()
+        Tribler._get_tribler_unit = MagicMock(side_effect=Exception)
+        subprocess.run = MagicMock(return_value=MagicMock(stdout=b'active\n'))
+        assert(Tribler.running())
+        assert(Tribler.running())
+        self.assertEqual(Tribler._get_tribler_unit.call_count, 1)
+        self.assertEqual(subprocess.run.call_count, 2)
+
+        Tribler._dbus_unavailable = False
+        subprocess.run = self.true_subprocess_run
+        Tribler._get_tribler_unit = self.true_get_tribler_unit
+        Tribler.SystemBus = self.true_system_bus
+
     def test_start(self):
         self.true_logger_log = logger.log
         self.true_logger_success = logger.success
@@ -63,10 +110,10 @@ class TestTriblerController(unittest.TestCase):
         self.assertEquals(Tribler.get_uploaded(), 0.0003814697265625)
 
     def test_get_uploaded_error(self):
-        self.requests = requests.get
-        requests.get = MagicMock(side_effect=requests.ConnectionError)
+        self.requests = Tribler._session.get
+        Tribler._session.get = MagicMock(side_effect=requests.ConnectionError)
         self.assertEquals(Tribler.get_uploaded(), "Unable to retrieve amount of uploaded data")
-        requests.get = self.requests
+        Tribler._session.get = self.requests
 
     @responses.activate
     def test_get_downloaded(self):
@@ -75,10 +122,10 @@ class TestTriblerController(unittest.TestCase):
         self.assertEquals(Tribler.get_downloaded(), 0.0003814697265625)
 
     def test_get_downloaded_error(self):
-        self.requests = requests.get
-        requests.get = MagicMock(side_effect=requests.ConnectionError)
+        self.requests = Tribler._session.get
+        Tribler._session.get = MagicMock(side_effect=requests.ConnectionError)
         self.assertEquals(Tribler.get_downloaded(), "Unable to retrieve amount of downloaded data")
-        requests.get = self.requests
+        Tribler._session.get = self.requests
 
     @responses.activate
     def test_get_helped_by(self):
@@ -87,10 +134,10 @@ class TestTriblerController(unittest.TestCase):
         self.assertEquals(Tribler.get_helped_by(), 400)
 
     def test_get_helped_by_error(self):
-        self.requests = requests.get
-        requests.get = MagicMock(side_effect=requests.ConnectionError)
+        self.requests = Tribler._session.get
+        Tribler._session.get = MagicMock(side_effect=requests.ConnectionError)
         self.assertEquals(Tribler.get_helped_by(), "Unable to retrieve amount of peers that helped this agent")
-        requests.get = self.requests
+        Tribler._session.get = self.requests
 
     @responses.activate
     def test_get_helped(self):
@@ -99,10 +146,27 @@ class TestTriblerController(unittest.TestCase):
         self.assertEquals(Tribler.get_helped(), 400)
 
     def test_get_helped_error(self):
-        self.requests = requests.get
-        requests.get = MagicMock(side_effect=requests.ConnectionError)
+        self.requests = Tribler._session.get
+        Tribler._session.get = MagicMock(side_effect=requests.ConnectionError)
         self.assertEquals(Tribler.get_helped(), "Unable to retrieve amount of peers helped by this agent")
-        requests.get = self.requests
+        Tribler._session.get = self.requests
+
+    def test_get_uploaded_timeout(self):
+        self.requests = Tribler._session.get
+        Tribler._session.get = MagicMock(side_effect=requests.ReadTimeout)
+        self.assertEqual(Tribler.get_uploaded(), "Unable to retrieve amount of uploaded data")
+        Tribler._session.get = self.requests
+
+    @responses.activate
+    def test_get_statistics_cached(self):
+        responses.add(responses.GET, 'http://localhost:8085/trustchain/statistics',
+                      json={'statistics': {'total_up': 400, 'total_down': 400,
+                                           'peers_that_helped_pk': 1, 'peers_that_pk_helped': 2}})
+        self.assertEqual(Tribler.get_uploaded(), 0.0003814697265625)
+        self.assertEqual(Tribler.get_downloaded(), 0.0003814697265625)
+        self.assertEqual(Tribler.get_helped_by(), 1)
+        self.assertEqual(Tribler.get_helped(), 2)
+        self.assertEqual(len(responses.calls), 1)
 
 
 if __name__ == '__main__':
@@ -1,10 +1,21 @@
+import json
+import os
+import pathlib
+import tempfile
+import threading
 import unittest
+from unittest.mock import MagicMock
+
+import jsonpickle
+import rsa
 
 from plebnet.address_book import AddressBook
 from plebnet.messaging import Contact
 from plebnet.messaging import generate_contact_key_pair
 from plebnet.messaging import generate_contact_id
 from plebnet.messaging import Message
+from plebnet.messaging import MessageConsumer
+from plebnet.messaging import MessageReceiver
 import random
 import time
 
@@ -22,7 +33,7 @@ class TestAddressBook(unittest.TestCase):
         new_node_pub, new_node_priv = generate_contact_key_pair()
 
         parent_id = "" if parent_ab is None else parent_ab.self_contact.id
-        contacts = [] if parent_ab is None else parent_ab.contacts + [parent_ab.self_contact]
+        contacts = [] if parent_ab is None else parent_ab.get_contacts() + [parent_ab.self_contact]
 
         new_node_contact = Contact(
             host="127.0.0.1",
@@ -46,6 +57,22 @@ class TestAddressBook(unittest.TestCase):
 
         return new_node_ab
 
+    def new_address_book(
+            self,
+            contacts=None,
+            self_contact: Contact = None,
+            private_key: rsa.PrivateKey = None,
+            **kwargs
+    ) -> AddressBook:
+
+        if self_contact is None:
+            self_pub, private_key = generate_contact_key_pair()
+            self_contact = Contact(id="self", host="127.0.0.1", port=self.port_range_min, public_key=self_pub)
+
+        kwargs.setdefault('receiver_notify_interval', self.receiver_notify_interval)
+
+        return AddressBook(self_contact=self_contact, private_key=private_key, contacts=contacts, **kwargs)
+
     def test_node_replication(self):
 
         port_counter = self.port_range_min
@@ -79,6 +106,355 @@ class TestAddressBook(unittest.TestCase):
                 except:
                     continue
 
+    def test_gossip_fanout(self):
+
+        contacts = []
+
+        for i in range(5):
+            pub, _ = generate_contact_key_pair()
+            contacts.append(Contact(id=str(i), host="127.0.0.1", port=self.port_range_min + 1 + i, public_key=pub))
+
+        ab = self.new_address_book(contacts, gossip_fanout=2)
+
+        try:
+
+            ab.send_message_to_contacts = MagicMock(return_value=[])
+
+            new_pub, _ = generate_contact_key_pair()
+            ab.create_new_distributed_contact(Contact(id="new", host="127.0.0.1", port=0, public_key=new_pub))
+
+            # Waits for the forward to be sent by the send pool
+            ab.close()
+
+            recipients, message = ab.send_message_to_contacts.call_args[0]
+
+            assert len(recipients) == 2
+            assert all(recipient.id in ab.contacts and recipient.id != "new" for recipient in recipients)
+
+        finally:
+
+            ab.kill()
+
+    def test_contact_tiers(self):
+
+        contacts = []
+
+        for i in range(2):
+            pub, _ = generate_contact_key_pair()
+            contacts.append(Contact(id=str(i), host="127.0.0.1", port=self.port_range_min + 1 + i, public_key=pub))
+
+        up, down = contacts
+
+        ab = self.new_address_book(contacts)
+
+        try:
+
+            assert set(ab._active_contacts) == {up.id, down.id}
+            assert not ab._inactive_contacts
+
+            ab._set_link_state(False, down)
+
+            assert set(ab._active_contacts) == {up.id}
+            assert set(ab._inactive_contacts) == {down.id}
+
+            # Forwarding skips inactive contacts
+            ab._submit_send = MagicMock()
+
+            new_pub, _ = generate_contact_key_pair()
+            ab.create_new_distributed_contact(Contact(id="new", host="127.0.0.1", port=0, public_key=new_pub))
+
+            send, recipients, message = ab._submit_send.call_args[0]
+
+            assert [recipient.id for recipient in recipients] == [up.id]
+
+            ab._set_link_state(True, down)
+
+            assert set(ab._active_contacts) == {up.id, down.id, "new"}
+            assert not ab._inactive_contacts
+
+            ab._set_link_state(False, down)
+            ab._delete_contact(down)
+
+            assert down.id not in ab.contacts
+            assert down.id not in ab._active_contacts
+            assert down.id not in ab._inactive_contacts
+
+        finally:
+
+            ab.kill()
+
+    def test_duplicate_add_contact_ignored(self):
+
+        ab = self.new_address_book()
+
+        try:
+
+            # Records the forwards instead of sending them
+            ab._submit_send = MagicMock()
+
+            new_pub, _ = generate_contact_key_pair()
+            new_contact = Contact(id="new", host="127.0.0.1", port=0, public_key=new_pub)
+            message = ab._generate_add_contact_message(new_contact)
+
+            ab.notify(message, "sender1")
+            ab.notify(message, "sender1")
+            ab.notify(message, "sender2")
+
+            assert list(ab.contacts) == [new_contact.id]
+            assert ab._submit_send.call_count == 1
+
+            # A deleted contact introduced again, e.g. after recovering, is added and forwarded again
+            ab._delete_contact(new_contact)
+            ab.notify(message, "sender1")
+
+            assert list(ab.contacts) == [new_contact.id]
+            assert ab._submit_send.call_count == 2
+
+        finally:
+
+            ab.kill()
+
+    def test_legacy_commands(self):
+
+        ab = self.new_address_book()
+
+        try:
+
+            # Records the forwards instead of sending them
+            ab._submit_send = MagicMock()
+
+            new_pub, _ = generate_contact_key_pair()
+            new_contact = Contact(id="new", host="127.0.0.1", port=0, public_key=new_pub)
+
+            # Messages of nodes running an older version, which send command names
+            ab.notify(Message(channel='network', command='ping'), "sender")
+            ab.notify(Message(channel='network', command='add-contact', data=new_contact), "sender")
+
+            assert list(ab.contacts) == [new_contact.id]
+            assert ab._submit_send.call_count == 1
+
+        finally:
+
+            ab.kill()
+
+    def test_snapshot_warm_start(self):
+
+        contact_pub, _ = generate_contact_key_pair()
+        contact = Contact(id="contact", host="127.0.0.1", port=self.port_range_min + 1, public_key=contact_pub)
+
+        with tempfile.TemporaryDirectory() as directory:
+
+            snapshot_path = os.path.join(directory, 'contacts.json')
+
+            ab = self.new_address_book([contact], snapshot_path=snapshot_path)
+
+            ab.close()
+
+            ab = self.new_address_book(
+                self_contact=ab.self_contact,
+                private_key=ab._private_key,
+                snapshot_path=snapshot_path
+            )
+
+            try:
+
+                assert list(ab.contacts) == [contact.id]
+                assert ab.contacts[contact.id].host == contact.host
+                assert ab.contacts[contact.id].port == contact.port
+                assert ab.contacts[contact.id].public_key == contact.public_key
+
+            finally:
+
+                ab.kill()
+
+    def test_snapshot_path_like(self):
+
+        contact_pub, _ = generate_contact_key_pair()
+        contact = Contact(id="contact", host="127.0.0.1", port=self.port_range_min + 1, public_key=contact_pub)
+
+        with tempfile.TemporaryDirectory() as directory:
+
+            snapshot_path = pathlib.Path(directory) / 'contacts.json'
+
+            ab = self.new_address_book([contact], snapshot_path=snapshot_path)
+
+            ab.close()
+
+            assert snapshot_path.is_file()
+
+            ab = self.new_address_book(
+                self_contact=ab.self_contact,
+                private_key=ab._private_key,
+                snapshot_path=snapshot_path
+            )
+
+            try:
+
+                assert list(ab.contacts) == [contact.id]
+
+            finally:
+
+                ab.kill()
+
+    def test_corrupt_snapshot(self):
+
+        contact_pub, _ = generate_contact_key_pair()
+
+        with tempfile.TemporaryDirectory() as directory:
+
+            snapshot_path = os.path.join(directory, 'contacts.json')
+
+            with open(snapshot_path, 'w') as snapshot_file:
+                json.dump([
+                    {
+                        'id': "corrupt",
+                        'host': "127.0.0.1",
+                        'port': self.port_range_min + 1,
+                        'public_key': "-----BEGIN RSA PUBLIC KEY-----\nAAAA\n-----END RSA PUBLIC KEY-----"
+                    },
+                    {
+                        'id': "incomplete"
+                    },
+                    {
+                        'id': "contact",
+                        'host': "127.0.0.1",
+                        'port': self.port_range_min + 2,
+                        'public_key': contact_pub.save_pkcs1().decode('utf-8')
+                    }
+                ], snapshot_file)
+
+            ab = self.new_address_book(snapshot_path=snapshot_path)
+
+            try:
+
+                assert list(ab.contacts) == ["contact"]
+                assert ab.contacts["contact"].public_key == contact_pub
+
+            finally:
+
+                ab.kill()
+
+    def test_concurrent_snapshot_saves(self):
+
+        contact_pub, _ = generate_contact_key_pair()
+        contact = Contact(id="contact", host="127.0.0.1", port=self.port_range_min + 1, public_key=contact_pub)
+
+        with tempfile.TemporaryDirectory() as directory:
+
+            snapshot_path = os.path.join(directory, 'contacts.json')
+
+            ab = self.new_address_book([contact], snapshot_path=snapshot_path)
+
+            errors = []
+
+            def save():
+                try:
+                    for i in range(20):
+                        ab.save_snapshot()
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=save) for i in range(4)]
+
+            for thread in threads:
+                thread.start()
+
+            # close() saves as well, while the other saves are still running
+            ab.close()
+
+            for thread in threads:
+                thread.join()
+
+            assert not errors
+            assert [loaded.id for loaded in AddressBook._load_snapshot(snapshot_path)] == [contact.id]
+
+    def test_jsonpickle_round_trip(self):
+
+        contact_pub, _ = generate_contact_key_pair()
+        contact = Contact(id="contact", host="127.0.0.1", port=self.port_range_min + 1, public_key=contact_pub)
+
+        ab = self.new_address_book([contact], gossip_fanout=4)
+
+        consumer = MessageConsumer()
+        ab.receiver.register_consumer("qtable", consumer)
+
+        ab.kill()
+
+        # Saved and loaded the way QTable persists its address book
+        decoded_ab = jsonpickle.decode(jsonpickle.encode({'address_book': ab}))['address_book']
+
+        try:
+
+            assert decoded_ab.self_contact.id == ab.self_contact.id
+            assert list(decoded_ab.contacts) == [contact.id]
+            assert decoded_ab._gossip_fanout == 4
+            assert decoded_ab.receiver.notify_interval == self.receiver_notify_interval
+            assert len(decoded_ab.receiver._consumers["qtable"]) == 1
+
+            # No receiver is listening on the contact's port
+            assert not decoded_ab.send_message_to_contact(decoded_ab.contacts[contact.id], Message(
+                channel="test",
+                command="test"
+            ))
+
+            assert contact.id in decoded_ab._inactive_contacts
+
+        finally:
+
+            decoded_ab.kill()
+
+    def test_ping_scheduling(self):
+
+        contact_pub, contact_priv = generate_contact_key_pair()
+        contact = Contact(id="contact", host="127.0.0.1", port=self.port_range_min + 1, public_key=contact_pub)
+
+        ab = self.new_address_book(
+            [contact],
+            contact_restore_timeout=3600,
+            inactive_nodes_ping_interval=self.inactive_nodes_ping_interval
+        )
+
+        receiver = MessageReceiver(
+            port=contact.port,
+            private_key=contact_priv,
+            contacts=[ab.self_contact],
+            notify_interval=self.receiver_notify_interval
+        )
+
+        try:
+
+            time.sleep(self.receiver_notify_interval)
+
+            ab._set_link_state(False, contact)
+
+            # The ping is only sent once the ping interval has elapsed
+            assert contact.id in ab._scheduled_pings
+            time.sleep(self.inactive_nodes_ping_interval / 2)
+            assert not ab.contacts[contact.id].is_active()
+
+            # The successful ping brings the contact back up
+            time.sleep(self.inactive_nodes_ping_interval * 1.5)
+            assert ab.contacts[contact.id].is_active()
+            assert contact.id not in ab._scheduled_pings
+
+            receiver.kill()
+
+            # Failed pings delete the contact once the restore timeout has expired
+            ab._contact_restore_timeout = -1
+            ab._set_link_state(False, contact)
+
+            time.sleep(self.inactive_nodes_ping_interval * 2)
+            assert contact.id not in ab.contacts
+
+        finally:
+
+            ab.kill()
+
+            try:
+                receiver.kill()
+            except:
+                pass
+
     def test_contact_removal_unexpected_death(self):
 
         nodes = []
@@ -136,7 +512,7 @@ class TestAddressBook(unittest.TestCase):
                 command="test"
             ))
 
-            assert not nodes[0].contacts[0].is_active()
+            assert not nodes[0].contacts[nodes[1].self_contact.id].is_active()
 
             nodes[1] = AddressBook(
                 self_contact=nodes[1].self_contact,
@@ -149,7 +525,7 @@ class TestAddressBook(unittest.TestCase):
 
             time.sleep(self.inactive_nodes_ping_interval * 1.5)
 
-            assert nodes[0].contacts[0].is_active()
+            assert nodes[0].contacts[nodes[1].self_contact.id].is_active()
 
         finally:
 
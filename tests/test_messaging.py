@@ -1,3 +1,6 @@
+import pickle
+import socket
+import threading
 import unittest
 import time
 from plebnet.messaging import Contact
@@ -7,6 +10,7 @@ from plebnet.messaging import MessageReceiver
 from plebnet.messaging import MessageSender
 from plebnet.messaging import MessageDeliveryError
 from plebnet.messaging import generate_contact_key_pair
+from plebnet.messaging import run_coroutine
 
 
 class DebugConsumer(MessageConsumer):
@@ -170,6 +174,204 @@ class TestMessaging(unittest.TestCase):
 
         self.assert_and_kill_receiver(assertions, receiver)
 
+    def test_messaging_async(self) -> None:
+        """
+        Tests that encoded messages sent on the messaging event loop are received.
+        """
+
+        receiver_public, receiver_private = generate_contact_key_pair()
+        sender_public, sender_private = generate_contact_key_pair()
+
+        sender_contact = Contact(
+            id="sender",
+            public_key=sender_public,
+            host=self.localhost,
+            port=self.port_range_min
+        )
+
+        receiver_contact = Contact(
+            id="receiver",
+            public_key=receiver_public,
+            host=self.localhost,
+            port=self.port_range_min
+        )
+
+        channel = "channel1"
+
+        sender = MessageSender(receiver_contact)
+
+        consumer = DebugConsumer()
+
+        receiver = MessageReceiver(
+            port=self.port_range_min,
+            private_key=receiver_private,
+            contacts={sender_contact.id: sender_contact},
+            notify_interval=self.notify_interval
+        )
+        receiver.register_consumer(channel, consumer)
+
+        message = Message(channel, "test command", "test data")
+
+        run_coroutine(sender.send_encoded_message_async(
+            encoded_message=MessageSender.encode_message(message, sender_private),
+            sender_contact_id=sender_contact.id
+        ))
+
+        time.sleep(self.notify_interval * 2)
+
+        def assertions():
+
+            assert len(consumer.messages) == 1
+
+            received_message_sender_id, received_message = consumer.messages[0]
+
+            assert received_message_sender_id == sender_contact.id
+            assert received_message == message
+
+        self.assert_and_kill_receiver(assertions, receiver)
+
+    def test_messaging_async_no_receiver(self) -> None:
+        """
+        Tests that sending a message to an unreachable receiver results in MessageDeliveryError.
+        """
+
+        receiver_public, receiver_private = generate_contact_key_pair()
+        sender_public, sender_private = generate_contact_key_pair()
+
+        receiver_contact = Contact(
+            id="receiver",
+            public_key=receiver_public,
+            host=self.localhost,
+            port=self.port_range_min
+        )
+
+        sender = MessageSender(receiver_contact)
+
+        with self.assertRaises(MessageDeliveryError):
+            run_coroutine(sender.send_encoded_message_async(
+                encoded_message=MessageSender.encode_message(Message("channel1", "test command"), sender_private),
+                sender_contact_id="sender"
+            ))
+
+    def test_messaging_async_connect_timeout(self) -> None:
+        """
+        Tests that connecting to a receiver which drops connection attempts fails after the connect timeout.
+        """
+
+        receiver_public, receiver_private = generate_contact_key_pair()
+        sender_public, sender_private = generate_contact_key_pair()
+
+        # Non-routable address, connection attempts are never answered
+        receiver_contact = Contact(
+            id="receiver",
+            public_key=receiver_public,
+            host="10.255.255.1",
+            port=self.port_range_min
+        )
+
+        sender = MessageSender(receiver_contact)
+
+        start = time.monotonic()
+
+        with self.assertRaises(MessageDeliveryError):
+            run_coroutine(sender.send_encoded_message_async(
+                encoded_message=MessageSender.encode_message(Message("channel1", "test command"), sender_private),
+                sender_contact_id="sender",
+                connect_timeout=0.2
+            ))
+
+        assert time.monotonic() - start < 1.0
+
+    def test_messaging_async_send_timeout(self) -> None:
+        """
+        Tests that sending to a receiver which acks the header but never reads the payload fails after the send
+        timeout.
+        """
+
+        receiver_public, receiver_private = generate_contact_key_pair()
+        sender_public, sender_private = generate_contact_key_pair()
+
+        receiver_contact = Contact(
+            id="receiver",
+            public_key=receiver_public,
+            host=self.localhost,
+            port=self.port_range_min
+        )
+
+        # Receiver with a small receive buffer, which acks the header and then stops reading
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        server.bind((self.localhost, self.port_range_min))
+        server.listen(1)
+
+        connections = []
+
+        def accept():
+            connection, _ = server.accept()
+            connections.append(connection)
+            connection.send(b'\xff')
+
+        thread = threading.Thread(target=accept)
+        thread.daemon = True
+        thread.start()
+
+        sender = MessageSender(receiver_contact)
+
+        start = time.monotonic()
+
+        try:
+
+            with self.assertRaises(MessageDeliveryError):
+                run_coroutine(sender.send_encoded_message_async(
+                    encoded_message=MessageSender.encode_message(Message("channel1", "x" * 2 ** 24), sender_private),
+                    sender_contact_id="sender",
+                    send_timeout=0.2
+                ))
+
+            assert time.monotonic() - start < 5.0
+
+        finally:
+
+            for connection in connections:
+                connection.close()
+
+            server.close()
+
+    def test_unpickle_legacy_contact(self) -> None:
+        """
+        Tests that contacts pickled before Contact defined __slots__, with a dict state, can still be unpickled.
+        """
+
+        public, private = generate_contact_key_pair()
+
+        legacy_state = {
+            'id': "contact",
+            'host': self.localhost,
+            'port': self.port_range_min,
+            'public_key': public,
+            'first_failure': 42
+        }
+
+        class LegacyContact:
+
+            def __reduce_ex__(self, protocol):
+                return object.__new__, (Contact,), legacy_state
+
+        contact = pickle.loads(pickle.dumps(LegacyContact()))
+
+        assert isinstance(contact, Contact)
+        assert contact.id == "contact"
+        assert contact.host == self.localhost
+        assert contact.port == self.port_range_min
+        assert contact.public_key == public
+        assert contact.first_failure == 42
+
+        contact = pickle.loads(pickle.dumps(contact))
+
+        assert contact.public_key == public
+        assert contact.first_failure == 42
+
     def test_kill_receiver(self):
         """
         Tests that a receiver can be open and appropriately killed.